@@ -1,9 +1,14 @@
 # bot.py
 import os
+import asyncio
+import atexit
+import math
+import pickle
 import time
 import logging
-import requests
-from datetime import datetime, timedelta
+import aiohttp
+import numpy as np
+import orjson
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 
@@ -37,142 +42,318 @@ user_settings = {
     "watchlist": [s.strip() for s in WATCHLIST]
 }
 
+# Зеркало watchlist для O(1)-проверки «монета уже в списке»
+_watchlist_set = set(user_settings["watchlist"])
+
+def normalize_symbol(arg):
+    """BTC / btc / BTCUSDT -> BTCUSDT."""
+    return arg.upper().replace("USDT", "") + "USDT"
+
 # === Хранение истории цен ===
+# Кольцевой буфер на 30 минут: два плотных float-массива вместо списка словарей
+HISTORY_WINDOW_SECONDS = 30 * 60
+HISTORY_SIZE = math.ceil(HISTORY_WINDOW_SECONDS / CHECK_INTERVAL_SECONDS) + 1
+
+class History:
+    """История цен одного символа: кольцевые numpy-массивы времён и цен."""
+    __slots__ = ("times", "prices", "head")
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.times = np.empty(size, dtype=np.float64)
+        self.prices = np.empty(size, dtype=np.float64)
+        self.head = 0
+
+    def append(self, ts, price):
+        i = self.head % len(self.times)
+        self.times[i] = ts
+        self.prices[i] = price
+        self.head += 1
+
+    def view(self):
+        """Возвращает (times, prices) в хронологическом порядке."""
+        n = len(self.times)
+        if self.head <= n:
+            return self.times[:self.head], self.prices[:self.head]
+        start = self.head % n
+        return np.roll(self.times, -start), np.roll(self.prices, -start)
+
 price_history = {}
 
+# Снимок истории на диск: после рестарта бот не «слепнет» на 30 минут
+HISTORY_FILE = os.getenv("HISTORY_FILE", "history.pkl")
+HISTORY_SAVE_EVERY = 10  # циклов между снимками
+_cycles_since_save = 0
+
+def save_history():
+    try:
+        with open(HISTORY_FILE, "wb") as f:
+            pickle.dump(price_history, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.error("Не удалось сохранить историю: %s", e)
+
+def load_history():
+    global price_history
+    try:
+        with open(HISTORY_FILE, "rb") as f:
+            restored = pickle.load(f)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        logger.error("Не удалось загрузить историю: %s", e)
+        return
+
+    # Кольцевой буфер вытесняет по числу слотов, а не по времени, поэтому
+    # записи старше окна отбрасываем здесь — иначе после рестарта со старым
+    # снимком первый цикл сравнит живую цену с многочасовой базой.
+    # Перекладка в свежие буферы заодно чинит ёмкость, если менялся
+    # CHECK_INTERVAL_SECONDS.
+    cutoff = time.time() - HISTORY_WINDOW_SECONDS
+    loaded = {}
+    try:
+        for symbol, old in restored.items():
+            times, prices = old.view()
+            fresh = times >= cutoff
+            if not fresh.any():
+                continue
+            hist = History()
+            for ts, price in zip(times[fresh], prices[fresh]):
+                hist.append(ts, price)
+            loaded[symbol] = hist
+    except Exception as e:
+        logger.error("Не удалось восстановить историю: %s", e)
+        return
+
+    if loaded:
+        price_history = loaded
+        logger.info("📂 История восстановлена: %d символов", len(loaded))
+    else:
+        logger.info("📂 Снимок истории целиком устарел — начинаем с чистого листа")
+
+# === Общая HTTP-сессия (создаётся в post_init) ===
+http_session = None
+
 # === Логирование ===
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# === Клавиатуры ===
-def get_main_menu_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("📊 Биржи", callback_data="exchanges"),
-         InlineKeyboardButton("⚙️ Настройки", callback_data="settings")],
-        [InlineKeyboardButton("👤 Профиль", callback_data="profile"),
-         InlineKeyboardButton("💳 Доступ", callback_data="access")]
-    ])
-
-def get_settings_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🟢 Период лонг", callback_data="set_long_period"),
-         InlineKeyboardButton("➕ % лонг", callback_data="set_long_percent")],
-        [InlineKeyboardButton("🔴 Период шорт", callback_data="set_short_period"),
-         InlineKeyboardButton("➕ % шорт", callback_data="set_short_percent")],
-        [InlineKeyboardButton("🔻 Период дамп", callback_data="set_dump_period"),
-         InlineKeyboardButton("➕ % дамп", callback_data="set_dump_percent")],
-        [InlineKeyboardButton("👀 Посмотреть настройки", callback_data="show_settings")],
-        [InlineKeyboardButton("🔚 Назад", callback_data="back_to_menu")]
-    ])
+# === Клавиатуры (неизменяемые — собираем один раз при импорте) ===
+MAIN_MENU_KB = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Биржи", callback_data="exchanges"),
+     InlineKeyboardButton("⚙️ Настройки", callback_data="settings")],
+    [InlineKeyboardButton("👤 Профиль", callback_data="profile"),
+     InlineKeyboardButton("💳 Доступ", callback_data="access")]
+])
+
+SETTINGS_KB = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🟢 Период лонг", callback_data="set_long_period"),
+     InlineKeyboardButton("➕ % лонг", callback_data="set_long_percent")],
+    [InlineKeyboardButton("🔴 Период шорт", callback_data="set_short_period"),
+     InlineKeyboardButton("➕ % шорт", callback_data="set_short_percent")],
+    [InlineKeyboardButton("🔻 Период дамп", callback_data="set_dump_period"),
+     InlineKeyboardButton("➕ % дамп", callback_data="set_dump_percent")],
+    [InlineKeyboardButton("👀 Посмотреть настройки", callback_data="show_settings")],
+    [InlineKeyboardButton("🔚 Назад", callback_data="back_to_menu")]
+])
 
 # === Binance API ===
-def get_binance_ticker(symbol):
+# Кэш тикеров (stale-while-revalidate): свежие данные отдаём сразу,
+# слегка устаревшие — тоже сразу, но с фоновым обновлением
+CACHING_TTL = float(os.getenv("CACHING_TTL", "5"))
+CACHING_STALE_WHILE_REVALIDATE_TTL = float(os.getenv("CACHING_STALE_WHILE_REVALIDATE_TTL", "25"))
+_tickers_cache = None  # (fetched_at, {symbol: data})
+_refresh_task = None
+
+# Фьючерсный API (в отличие от спотового /api/v3) не принимает параметр
+# symbols=[...], поэтому всегда качаем полный список и фильтруем локально
+TICKERS_URL = "https://fapi.binance.com/fapi/v1/ticker/24hr"
+
+async def _fetch_all_binance_tickers(session):
+    """Один запрос на все тикеры сразу — вместо N запросов по одному."""
     try:
-        url = f"https://fapi.binance.com/fapi/v1/ticker/24hr?symbol={symbol}"
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            return {
-                "symbol": symbol,
-                "price": float(data["lastPrice"]),
-                "priceChangePercent": float(data["priceChangePercent"]),
-                "volume": float(data["quoteVolume"])
-            }
+        async with session.get(TICKERS_URL, timeout=aiohttp.ClientTimeout(total=5)) as resp:
+            if resp.status == 200:
+                # orjson разбирает большой ответ заметно быстрее stdlib json
+                data = orjson.loads(await resp.read())
+                return {d["symbol"]: d for d in data}
     except Exception as e:
-        logger.error(f"Binance error for {symbol}: {e}")
+        logger.error("Binance error: %s", e)
     return None
 
+async def _refresh_tickers():
+    global _tickers_cache, _refresh_task
+    try:
+        tickers = await _fetch_all_binance_tickers(http_session)
+        if tickers:
+            _tickers_cache = (time.time(), tickers)
+    finally:
+        _refresh_task = None
+
+async def get_all_binance_tickers(session):
+    global _tickers_cache, _refresh_task
+    now = time.time()
+    if _tickers_cache:
+        age = now - _tickers_cache[0]
+        if age < CACHING_TTL:
+            return _tickers_cache[1]
+        if age < CACHING_TTL + CACHING_STALE_WHILE_REVALIDATE_TTL:
+            # отдаём устаревшие данные сразу, обновляем в фоне
+            if _refresh_task is None:
+                _refresh_task = asyncio.create_task(_refresh_tickers())
+            return _tickers_cache[1]
+    tickers = await _fetch_all_binance_tickers(session)
+    if tickers:
+        _tickers_cache = (now, tickers)
+    return tickers
+
 # === Отправка уведомления ===
-async def send_alert(context: ContextTypes.DEFAULT_TYPE, symbol: str, price: float, volume: float, signal_type: str, pct_change: float):
-    emoji = {"PUMP": "🟢", "SHORT": "🟡", "DUMP": "🔴"}.get(signal_type, "🔵")
-    label = {"PUMP": "Pump", "SHORT": "Short", "DUMP": "Dump"}.get(signal_type, signal_type)
-
-    message = (
-        f"{emoji} **{label}: {abs(pct_change):.2f}%** ({symbol})\n"
-        f"📊 Volume: ${volume:,.0f}\n"
-        f"⏱️ {datetime.utcnow().strftime('%H:%M UTC')}"
+ALERT_EMOJI = {"PUMP": "🟢", "SHORT": "🟡", "DUMP": "🔴"}
+ALERT_LABEL = {"PUMP": "Pump", "SHORT": "Short", "DUMP": "Dump"}
+ALERT_TEMPLATE = (
+    "{emoji} *{label}: {pct:.2f}%* ({symbol})\n"
+    "📊 Volume: ${volume:,.0f}\n"
+    "⏱️ {time}"
+)
+
+# Ограниченная очередь исходящих сообщений: сканирование не ждёт Telegram API
+_alert_queue = asyncio.Queue(maxsize=100)
+_alert_worker_task = None
+
+def send_alert(symbol: str, price: float, volume: float, signal_type: str, pct_change: float):
+    message = ALERT_TEMPLATE.format(
+        emoji=ALERT_EMOJI.get(signal_type, "🔵"),
+        label=ALERT_LABEL.get(signal_type, signal_type),
+        pct=abs(pct_change),
+        symbol=symbol,
+        volume=volume,
+        time=time.strftime("%H:%M UTC", time.gmtime()),
     )
     try:
-        await context.bot.send_message(
-            chat_id=ADMIN_CHAT_ID,
-            text=message,
-            parse_mode="Markdown"
-        )
-        logger.info(f"✅ Отправлен сигнал: {signal_type} {symbol} {pct_change:.2f}%")
-    except Exception as e:
-        logger.error(f"Ошибка отправки в Telegram: {e}")
+        _alert_queue.put_nowait({
+            "chat_id": ADMIN_CHAT_ID,
+            "text": message,
+            "parse_mode": "Markdown"
+        })
+        logger.info("✅ Сигнал в очереди: %s %s %.2f%%", signal_type, symbol, pct_change)
+    except asyncio.QueueFull:
+        logger.warning("⚠️ Очередь уведомлений переполнена, сигнал %s %s отброшен", signal_type, symbol)
+
+async def alert_worker(bot):
+    """Фоновая отправка уведомлений из очереди."""
+    while True:
+        alert = await _alert_queue.get()
+        try:
+            await bot.send_message(**alert)
+        except Exception as e:
+            logger.error("Ошибка отправки в Telegram: %s", e)
 
 # === Основной цикл проверки ===
+_cycle_lock = asyncio.Lock()
+
 async def check_signals(context: ContextTypes.DEFAULT_TYPE):
-    now = datetime.utcnow()
-    logger.info(f"🔁 Проверка {len(user_settings['watchlist'])} монет: {user_settings['watchlist']}")
+    # Не даём циклам накладываться: если предыдущий ещё работает — пропускаем запуск
+    if _cycle_lock.locked():
+        logger.warning("⏭️ Предыдущий цикл проверки ещё не завершён — пропускаем запуск")
+        return
+    async with _cycle_lock:
+        await _run_check_cycle()
+
+async def _run_check_cycle():
+    now_ts = time.time()
+    logger.info("🔁 Проверка %d монет: %s", len(user_settings["watchlist"]), user_settings["watchlist"])
+
+    # Один запрос на все тикеры, дальше фильтруем локально
+    tickers = await get_all_binance_tickers(http_session)
+    if not tickers:
+        return
+
+    # CPU-часть выносим в отдельный поток, чтобы не блокировать обработчики Telegram
+    alerts = await asyncio.to_thread(scan_history, now_ts, tickers)
+    for alert in alerts:
+        send_alert(*alert)
+
+    # Периодический снимок истории на диск
+    global _cycles_since_save
+    _cycles_since_save += 1
+    if _cycles_since_save >= HISTORY_SAVE_EVERY:
+        _cycles_since_save = 0
+        save_history()
+
+def scan_history(now_ts, tickers):
+    """Чистый CPU-проход по watchlist: обновляет историю, возвращает список сигналов."""
+    # Настройки не меняются внутри цикла — считаем отметки и пороги один раз,
+    # а не на каждый символ. Порог переводим в множитель цены, чтобы внутри
+    # цикла сравнивать без деления: price >= base * factor (для дампа — <=).
+    # Конфигурация: (тип сигнала, отметка времени, множитель, знак)
+    min_volume = user_settings["min_volume"]
+    checks = []
+    for signal_type, period_key, pct_key, sign in (
+        ("PUMP", "long_period_minutes", "long_percent", 1),
+        ("SHORT", "short_period_minutes", "short_percent", 1),
+        ("DUMP", "dump_period_minutes", "dump_percent", -1),
+    ):
+        threshold = user_settings[pct_key]
+        if threshold <= 0:
+            continue
+        checks.append((
+            signal_type,
+            now_ts - user_settings[period_key] * 60,
+            1 + sign * threshold / 100,
+            sign,
+        ))
+
+    alerts = []
 
     for symbol in user_settings["watchlist"]:
-        # Получаем текущие данные
-        ticker = get_binance_ticker(symbol)
+        ticker = tickers.get(symbol)
         if not ticker:
             continue
 
-        price = ticker["price"]
-        volume = ticker["volume"]
+        price = float(ticker["lastPrice"])
+        volume = float(ticker["quoteVolume"])
 
         # Фильтр по объёму
-        if volume < user_settings["min_volume"]:
-            logger.debug(f"📉 {symbol} пропущен: объём {volume:,.0f} < {user_settings['min_volume']}")
+        if volume < min_volume:
+            logger.debug("📉 %s пропущен: объём %.0f < %s", symbol, volume, min_volume)
             continue
 
-        # Сохраняем цену в историю
-        if symbol not in price_history:
-            price_history[symbol] = []
-        price_history[symbol].append({"time": now, "price": price})
-
-        # Очищаем старые данные (>30 минут)
-        cutoff = now - timedelta(minutes=30)
-        price_history[symbol] = [p for p in price_history[symbol] if p["time"] > cutoff]
-
-        # === Проверка PUMP ===
-        if user_settings["long_percent"] > 0:
-            past = now - timedelta(minutes=user_settings["long_period_minutes"])
-            prices = [p for p in price_history[symbol] if p["time"] <= past]
-            if prices:
-                base_price = prices[-1]["price"]
-                if price > base_price:
-                    pct = (price - base_price) / base_price * 100
-                    if pct >= user_settings["long_percent"]:
-                        await send_alert(context, symbol, price, volume, "PUMP", pct)
-
-        # === Проверка SHORT ===
-        if user_settings["short_percent"] > 0:
-            past = now - timedelta(minutes=user_settings["short_period_minutes"])
-            prices = [p for p in price_history[symbol] if p["time"] <= past]
-            if prices:
-                base_price = prices[-1]["price"]
-                if price > base_price:
-                    pct = (price - base_price) / base_price * 100
-                    if pct >= user_settings["short_percent"]:
-                        await send_alert(context, symbol, price, volume, "SHORT", pct)
-
-        # === Проверка DUMP ===
-        if user_settings["dump_percent"] > 0:
-            past = now - timedelta(minutes=user_settings["dump_period_minutes"])
-            prices = [p for p in price_history[symbol] if p["time"] <= past]
-            if prices:
-                base_price = prices[-1]["price"]
-                if price < base_price:
-                    pct = (base_price - price) / base_price * 100
-                    if pct >= user_settings["dump_percent"]:
-                        await send_alert(context, symbol, price, volume, "DUMP", -pct)
-
-        time.sleep(0.5)  # не перегружать API
+        # Сохраняем цену в историю (кольцевой буфер сам вытесняет старое)
+        hist = price_history.get(symbol)
+        if hist is None:
+            hist = price_history[symbol] = History()
+        hist.append(now_ts, price)
+        times, prices = hist.view()
+
+        # === Проверка PUMP / SHORT / DUMP одним проходом ===
+        for signal_type, past_ts, factor, sign in checks:
+            idx = np.searchsorted(times, past_ts, side="right") - 1
+            if idx < 0:
+                continue
+            base_price = prices[idx]
+            if sign * price >= sign * base_price * factor:
+                # проценты считаем только когда сигнал действительно сработал
+                pct = (price - base_price) / base_price * 100
+                alerts.append((symbol, price, volume, signal_type, pct))
+
+    return alerts
 
 # === Команды и кнопки ===
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🚀 Добро пожаловать в PUMP Screener Binance & ByBit 📈\n"
         "Пользователь Shevaserg доступ открыт до 05.12.2025 14:26",
-        reply_markup=get_main_menu_keyboard()
+        reply_markup=MAIN_MENU_KB
     )
 
+# === Диспетчеризация настроек: callback_data -> (подпись для ввода, сеттер) ===
+SETTERS = {
+    "set_long_period": ("период лонга (мин)", lambda v: user_settings.__setitem__("long_period_minutes", max(1, int(v)))),
+    "set_long_percent": ("процент лонга (%)", lambda v: user_settings.__setitem__("long_percent", v)),
+    "set_short_period": ("период шорта (мин)", lambda v: user_settings.__setitem__("short_period_minutes", max(1, int(v)))),
+    "set_short_percent": ("процент шорта (%)", lambda v: user_settings.__setitem__("short_percent", v)),
+    "set_dump_period": ("период дампа (мин)", lambda v: user_settings.__setitem__("dump_period_minutes", max(1, int(v)))),
+    "set_dump_percent": ("процент дампа (%)", lambda v: user_settings.__setitem__("dump_percent", v)),
+}
+
 async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -186,19 +367,19 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"🔴 Шорт: {user_settings['short_percent']}% за {user_settings['short_period_minutes']} мин\n"
             f"🔻 Дамп: {user_settings['dump_percent']}% за {user_settings['dump_period_minutes']} мин"
         )
-        await query.edit_message_text(msg, reply_markup=get_settings_keyboard())
+        await query.edit_message_text(msg, reply_markup=SETTINGS_KB)
 
     elif query.data == "exchanges":
-        await query.edit_message_text("📊 Биржи: Binance", reply_markup=get_main_menu_keyboard())
+        await query.edit_message_text("📊 Биржи: Binance", reply_markup=MAIN_MENU_KB)
     elif query.data == "profile":
-        await query.edit_message_text("👤 Профиль: Shevaserg", reply_markup=get_main_menu_keyboard())
+        await query.edit_message_text("👤 Профиль: Shevaserg", reply_markup=MAIN_MENU_KB)
     elif query.data == "access":
-        await query.edit_message_text("💳 Доступ открыт до 05.12.2025 14:26", reply_markup=get_main_menu_keyboard())
+        await query.edit_message_text("💳 Доступ открыт до 05.12.2025 14:26", reply_markup=MAIN_MENU_KB)
     elif query.data == "back_to_menu":
         await query.edit_message_text(
             "🚀 Добро пожаловать в PUMP Screener Binance & ByBit 📈\n"
             "Пользователь Shevaserg доступ открыт до 05.12.2025 14:26",
-            reply_markup=get_main_menu_keyboard()
+            reply_markup=MAIN_MENU_KB
         )
     elif query.data == "show_settings":
         msg = (
@@ -206,19 +387,12 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"🔴 Шорт: {user_settings['short_percent']}% за {user_settings['short_period_minutes']} мин\n"
             f"🔻 Дамп: {user_settings['dump_percent']}% за {user_settings['dump_period_minutes']} мин"
         )
-        await query.edit_message_text(msg, reply_markup=get_settings_keyboard())
+        await query.edit_message_text(msg, reply_markup=SETTINGS_KB)
 
-    elif query.data in ["set_long_period", "set_long_percent", "set_short_period", "set_short_percent", "set_dump_period", "set_dump_percent"]:
+    elif query.data in SETTERS:
         context.user_data["awaiting_input"] = query.data
-        labels = {
-            "set_long_period": "период лонга (мин)",
-            "set_long_percent": "процент лонга (%)",
-            "set_short_period": "период шорта (мин)",
-            "set_short_percent": "процент шорта (%)",
-            "set_dump_period": "период дампа (мин)",
-            "set_dump_percent": "процент дампа (%)",
-        }
-        await query.edit_message_text(f"✏️ Введите {labels[query.data]}:")
+        label, _ = SETTERS[query.data]
+        await query.edit_message_text(f"✏️ Введите {label}:")
 
 # === Обработка ввода чисел ===
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -228,19 +402,8 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         value = float(update.message.text)
         key = context.user_data["awaiting_input"]
-
-        if key == "set_long_period":
-            user_settings["long_period_minutes"] = max(1, int(value))
-        elif key == "set_long_percent":
-            user_settings["long_percent"] = value
-        elif key == "set_short_period":
-            user_settings["short_period_minutes"] = max(1, int(value))
-        elif key == "set_short_percent":
-            user_settings["short_percent"] = value
-        elif key == "set_dump_period":
-            user_settings["dump_period_minutes"] = max(1, int(value))
-        elif key == "set_dump_percent":
-            user_settings["dump_percent"] = value
+        _, setter = SETTERS[key]
+        setter(value)
 
         await update.message.reply_text("✅ Настройка обновлена!")
         del context.user_data["awaiting_input"]
@@ -256,8 +419,9 @@ async def add_coin(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     added = []
     for arg in context.args:
-        symbol = arg.upper().replace("USDT", "") + "USDT"
-        if symbol not in user_settings["watchlist"]:
+        symbol = normalize_symbol(arg)
+        if symbol not in _watchlist_set:
+            _watchlist_set.add(symbol)
             user_settings["watchlist"].append(symbol)
             added.append(symbol)
 
@@ -268,12 +432,36 @@ async def add_coin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Все монеты уже в списке.")
 
 # === Запуск ===
+async def post_init(application):
+    global http_session, _alert_worker_task
+    # keep-alive: переиспользуем TCP/TLS-соединение между циклами
+    connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=60)
+    http_session = aiohttp.ClientSession(connector=connector)
+    # не через application.create_task: Application.stop() ждёт такие задачи,
+    # а бесконечный воркер нужно отменять самим
+    _alert_worker_task = asyncio.create_task(alert_worker(application.bot))
+
+async def post_shutdown(application):
+    if _alert_worker_task:
+        _alert_worker_task.cancel()
+    if http_session:
+        await http_session.close()
+
 def main():
     if not TELEGRAM_BOT_TOKEN or not ADMIN_CHAT_ID:
         logger.error("❌ Не заданы TELEGRAM_BOT_TOKEN или ADMIN_CHAT_ID")
         return
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    load_history()
+    atexit.register(save_history)
+
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("add", add_coin))